@@ -1,13 +1,21 @@
+import collections
+import threading
+import weakref
 from typing import (
     Any,
+    Callable,
+    ChainMap,
     Dict,
+    FrozenSet,
     ItemsView,
+    Iterable,
     Iterator,
     KeysView,
     List,
     Optional,
     Protocol,
     Set,
+    Tuple,
     TypeVar,
     Union,
     ValuesView,
@@ -20,6 +28,104 @@ from nornir.core.plugins.connections import ConnectionPlugin, ConnectionPluginRe
 HostOrGroup = TypeVar("HostOrGroup", "Host", "Group")
 
 
+# guards the registries below, they are created lazily and hosts may build
+# their caches from several runner threads at once
+_registry_lock = threading.Lock()
+
+
+def _invalidate(element: Union["InventoryElement", "Defaults"]) -> None:
+    """
+    Bumps the version of ``element`` and of every element that inherits from
+    it so their cached lookups are rebuilt on next use
+    """
+    element._version += 1
+    with _registry_lock:
+        children = list(element._children) if element._children else []
+    for c in children:
+        _invalidate(c)
+
+
+def _register_child(
+    parent: Union["InventoryElement", "Defaults"], child: "InventoryElement"
+) -> None:
+    # children are only registered once they cache something derived from
+    # their parents, elements without caches have nothing to invalidate
+    with _registry_lock:
+        if parent._children is None:
+            parent._children = weakref.WeakSet()
+        parent._children.add(child)
+
+
+def _register_owner(groups: "ParentGroups", owner: "InventoryElement") -> None:
+    # a list usually belongs to a single element, a plain weak reference is
+    # kept for it and a WeakSet is only created once the list is shared
+    with _registry_lock:
+        owners = getattr(groups, "_owners", None)
+        if owners is None:
+            groups._owners = weakref.ref(owner)
+        elif isinstance(owners, weakref.ref):
+            current = owners()
+            if current is None:
+                groups._owners = weakref.ref(owner)
+            elif current is not owner:
+                groups._owners = weakref.WeakSet((current, owner))
+        else:
+            owners.add(owner)
+
+
+def _owners(groups: "ParentGroups") -> List["InventoryElement"]:
+    with _registry_lock:
+        owners = getattr(groups, "_owners", None)
+        if owners is None:
+            return []
+        elif isinstance(owners, weakref.ref):
+            current = owners()
+            return [] if current is None else [current]
+        else:
+            return list(owners)
+
+
+def _invalidates_hierarchy(method: Callable[..., Any]) -> Callable[..., Any]:
+    def wrapper(self: "ParentGroups", *args: Any, **kwargs: Any) -> Any:
+        r = method(self, *args, **kwargs)
+        for owner in _owners(self):
+            _invalidate(owner)
+        return r
+
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+# attribute names per class, used to tell attributes from data in Host.get
+_class_attributes_cache: Dict[type, FrozenSet[str]] = {}
+
+
+def _class_attributes(cls: type) -> FrozenSet[str]:
+    attrs = _class_attributes_cache.get(cls)
+    if attrs is None:
+        attrs = frozenset(a for a in dir(cls) if not a.startswith("_"))
+        _class_attributes_cache[cls] = attrs
+    return attrs
+
+
+# slots holding cached lookups (or the links used to invalidate them) and the
+# value they start with, they are rebuilt on demand so they aren't copied
+_TRANSIENT_SLOTS = {
+    "_version": 0,
+    "_children": None,
+    "_extended_groups_cache": None,
+    "_chain": None,
+}
+
+
+def _slot_descriptors(cls: type) -> Iterator[Tuple[str, Any]]:
+    for c in cls.__mro__:
+        for name in c.__dict__.get("__slots__", ()):
+            if name not in ("__weakref__", "__dict__"):
+                yield name, c.__dict__[name]
+
+
 class BaseAttributes(object):
     __slots__ = ("hostname", "port", "username", "password", "platform")
 
@@ -37,6 +143,30 @@ class BaseAttributes(object):
         self.password = password
         self.platform = platform
 
+    def __getstate__(self) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        slots = {}
+        for name, slot in _slot_descriptors(type(self)):
+            if name in _TRANSIENT_SLOTS:
+                continue
+            try:
+                slots[name] = slot.__get__(self)
+            except AttributeError:
+                # never set, it stays unset in the copy
+                pass
+        return getattr(self, "__dict__", None), slots
+
+    def __setstate__(
+        self, state: Tuple[Optional[Dict[str, Any]], Dict[str, Any]]
+    ) -> None:
+        instance_dict, slots = state
+        if instance_dict:
+            self.__dict__.update(instance_dict)
+        for name, slot in _slot_descriptors(type(self)):
+            if name in _TRANSIENT_SLOTS:
+                slot.__set__(self, _TRANSIENT_SLOTS[name])
+            elif name in slots:
+                slot.__set__(self, slots[name])
+
     @classmethod
     def schema(cls) -> Dict[str, Any]:
         return {
@@ -49,14 +179,39 @@ class BaseAttributes(object):
 
     def dict(self) -> Dict[str, Any]:
         return {
-            "hostname": object.__getattribute__(self, "hostname"),
-            "port": object.__getattribute__(self, "port"),
-            "username": object.__getattribute__(self, "username"),
-            "password": object.__getattribute__(self, "password"),
-            "platform": object.__getattribute__(self, "platform"),
+            "hostname": _ATTRIBUTE_SLOTS["hostname"].__get__(self),
+            "port": _ATTRIBUTE_SLOTS["port"].__get__(self),
+            "username": _ATTRIBUTE_SLOTS["username"].__get__(self),
+            "password": _ATTRIBUTE_SLOTS["password"].__get__(self),
+            "platform": _ATTRIBUTE_SLOTS["platform"].__get__(self),
         }
 
 
+# slot descriptors of BaseAttributes, they give access to the value set on the
+# object itself even where Host resolves the attribute through its groups
+_ATTRIBUTE_SLOTS = {
+    name: getattr(BaseAttributes, name) for name in BaseAttributes.__slots__
+}
+
+
+def _inherited_attribute(name: str) -> property:
+    slot = _ATTRIBUTE_SLOTS[name]
+
+    def fget(self: "Host") -> Any:
+        v = slot.__get__(self)
+        if v is None:
+            for g in self._extended_groups():
+                r = slot.__get__(g)
+                if r is not None:
+                    return r
+
+            return slot.__get__(self.defaults)
+        else:
+            return v
+
+    return property(fget, slot.__set__)
+
+
 class ConnectionOptions(BaseAttributes):
     __slots__ = ("extras",)
 
@@ -93,6 +248,30 @@ class ConnectionOptions(BaseAttributes):
 
 
 class ParentGroups(List["Group"]):
+    # elements using this list whose cached lookups depend on it, they
+    # register themselves when they build those caches
+    __slots__ = ("_owners",)
+    _owners: Union[
+        "weakref.ReferenceType[InventoryElement]", "weakref.WeakSet[InventoryElement]"
+    ]
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # copies start without owners, they register again when needed
+        return (ParentGroups, (list(self),))
+
+    append = _invalidates_hierarchy(list.append)
+    extend = _invalidates_hierarchy(list.extend)
+    insert = _invalidates_hierarchy(list.insert)
+    remove = _invalidates_hierarchy(list.remove)
+    pop = _invalidates_hierarchy(list.pop)
+    clear = _invalidates_hierarchy(list.clear)
+    sort = _invalidates_hierarchy(list.sort)
+    reverse = _invalidates_hierarchy(list.reverse)
+    __setitem__ = _invalidates_hierarchy(list.__setitem__)
+    __delitem__ = _invalidates_hierarchy(list.__delitem__)
+    __iadd__ = _invalidates_hierarchy(list.__iadd__)
+    __imul__ = _invalidates_hierarchy(list.__imul__)
+
     def __contains__(self, value: object) -> bool:
         if isinstance(value, str):
             return any([value == g.name for g in self])
@@ -113,7 +292,15 @@ class ParentGroups(List["Group"]):
 
 
 class InventoryElement(BaseAttributes):
-    __slots__ = ("groups", "data", "connection_options")
+    __slots__ = (
+        "_groups",
+        "_data",
+        "connection_options",
+        "_version",
+        "_children",
+        "_extended_groups_cache",
+        "__weakref__",
+    )
 
     def __init__(
         self,
@@ -126,9 +313,14 @@ class InventoryElement(BaseAttributes):
         data: Optional[Dict[str, Any]] = None,
         connection_options: Optional[Dict[str, ConnectionOptions]] = None,
     ) -> None:
-        self.groups = groups or ParentGroups()
-        self.data = data or {}
+        self._groups = (
+            groups if isinstance(groups, ParentGroups) else ParentGroups(groups or ())
+        )
+        self._data = data or {}
         self.connection_options = connection_options or {}
+        self._version = 0
+        self._children: Optional["weakref.WeakSet[InventoryElement]"] = None
+        self._extended_groups_cache: Optional[Tuple[int, List["Group"]]] = None
         super().__init__(
             hostname=hostname,
             port=port,
@@ -137,6 +329,24 @@ class InventoryElement(BaseAttributes):
             platform=platform,
         )
 
+    @property
+    def groups(self) -> ParentGroups:
+        return self._groups
+
+    @groups.setter
+    def groups(self, value: ParentGroups) -> None:
+        self._groups = value if isinstance(value, ParentGroups) else ParentGroups(value)
+        _invalidate(self)
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        return self._data
+
+    @data.setter
+    def data(self, value: Dict[str, Any]) -> None:
+        self._data = value
+        _invalidate(self)
+
     @classmethod
     def schema(self) -> Dict[str, Any]:
         return {
@@ -183,21 +393,38 @@ class InventoryElement(BaseAttributes):
 
         this will return [group_a, group_1, group_X, group_2, group_b, group_3]
         """
+        return list(self._extended_groups())
+
+    def _extended_groups(self) -> List["Group"]:
+        """
+        Same as :meth:`extended_groups` but returns a list memoized until the
+        group hierarchy changes. Callers must not modify it.
+        """
+        version = self._version
+        cached = self._extended_groups_cache
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        parents = self._groups
+        _register_owner(parents, self)
+
         groups: List["Group"] = []
 
-        for g in self.groups:
+        for g in parents:
+            _register_child(g, self)
             if g not in groups:
                 groups.append(g)
 
-            for sg in g.extended_groups():
+            for sg in g._extended_groups():
                 if sg not in groups:
                     groups.append(sg)
 
+        self._extended_groups_cache = (version, groups)
         return groups
 
 
 class Defaults(BaseAttributes):
-    __slots__ = ("data", "connection_options")
+    __slots__ = ("_data", "connection_options", "_version", "_children", "__weakref__")
 
     def __init__(
         self,
@@ -209,8 +436,10 @@ class Defaults(BaseAttributes):
         data: Optional[Dict[str, Any]] = None,
         connection_options: Optional[Dict[str, ConnectionOptions]] = None,
     ) -> None:
-        self.data = data or {}
+        self._data = data or {}
         self.connection_options = connection_options or {}
+        self._version = 0
+        self._children: Optional["weakref.WeakSet[InventoryElement]"] = None
         super().__init__(
             hostname=hostname,
             port=port,
@@ -219,6 +448,15 @@ class Defaults(BaseAttributes):
             platform=platform,
         )
 
+    @property
+    def data(self) -> Dict[str, Any]:
+        return self._data
+
+    @data.setter
+    def data(self, value: Dict[str, Any]) -> None:
+        self._data = value
+        _invalidate(self)
+
     @classmethod
     def schema(self) -> Dict[str, Any]:
         return {
@@ -238,7 +476,14 @@ class Defaults(BaseAttributes):
 
 
 class Host(InventoryElement):
-    __slots__ = ("name", "connections", "defaults")
+    __slots__ = ("name", "connections", "_defaults", "_chain")
+
+    # resolved through the parent groups and the defaults when not set
+    hostname = _inherited_attribute("hostname")
+    port = _inherited_attribute("port")
+    username = _inherited_attribute("username")
+    password = _inherited_attribute("password")
+    platform = _inherited_attribute("platform")
 
     def __init__(
         self,
@@ -254,8 +499,9 @@ class Host(InventoryElement):
         defaults: Optional[Defaults] = None,
     ) -> None:
         self.name = name
-        self.defaults = defaults or Defaults(None, None, None, None, None, None, None)
+        self._defaults = defaults or Defaults(None, None, None, None, None, None, None)
         self.connections: Dict[str, ConnectionPlugin] = {}
+        self._chain: Optional[Tuple[int, ChainMap[str, Any]]] = None
         super().__init__(
             hostname=hostname,
             port=port,
@@ -267,24 +513,43 @@ class Host(InventoryElement):
             connection_options=connection_options,
         )
 
+    @property
+    def defaults(self) -> Defaults:
+        return self._defaults
+
+    @defaults.setter
+    def defaults(self, value: Defaults) -> None:
+        self._defaults = value
+        _invalidate(self)
+
+    def _data_chain(self) -> ChainMap[str, Any]:
+        """
+        Returns a :obj:`collections.ChainMap` over the data of the host, its
+        extended groups and the defaults. The chain is built on first use and
+        reused until the group hierarchy changes.
+        """
+        version = self._version
+        cached = self._chain
+        if cached is None or cached[0] != version:
+            _register_child(self.defaults, self)
+            chain = collections.ChainMap(
+                self.data,
+                *[g.data for g in self._extended_groups()],
+                self.defaults.data,
+            )
+            cached = (version, chain)
+            self._chain = cached
+        return cached[1]
+
     def extended_data(self) -> Dict[str, Any]:
         """
         Returns the data associated with the object including inherited data
         """
-        processed = []
-        result = {}
-        for k, v in self.data.items():
-            processed.append(k)
-            result[k] = v
-        for g in self.extended_groups():
-            for k, v in g.data.items():
-                if k not in processed:
-                    processed.append(k)
-                    result[k] = v
-        for k, v in self.defaults.data.items():
-            if k not in processed:
-                processed.append(k)
-                result[k] = v
+        maps = self._data_chain().maps
+        result = dict(maps[0])
+        for d in maps[1:]:
+            for k, v in d.items():
+                result.setdefault(k, v)
         return result
 
     @classmethod
@@ -328,48 +593,24 @@ class Host(InventoryElement):
             return self._has_parent_group_by_object(group)
 
     def _has_parent_group_by_name(self, group: str) -> bool:
-        for g in self.groups:
-            if g.name == group or g.has_parent_group(group):
+        for g in self._extended_groups():
+            if g.name == group:
                 return True
         return False
 
     def _has_parent_group_by_object(self, group: "Group") -> bool:
-        for g in self.groups:
-            if g is group or g.has_parent_group(group):
+        for g in self._extended_groups():
+            if g is group:
                 return True
         return False
 
     def __getitem__(self, item: str) -> Any:
-        try:
-            return self.data[item]
-
-        except KeyError:
-            for g in self.extended_groups():
-                try:
-                    r = g.data[item]
-                    return r
-                except KeyError:
-                    continue
-
-            r = self.defaults.data.get(item)
-            if r is not None:
-                return r
-
-            raise
-
-    def __getattribute__(self, name: str) -> Any:
-        if name not in ("hostname", "port", "username", "password", "platform"):
-            return object.__getattribute__(self, name)
-        v = object.__getattribute__(self, name)
-        if v is None:
-            for g in self.extended_groups():
-                r = object.__getattribute__(g, name)
-                if r is not None:
-                    return r
-
-            return object.__getattribute__(self.defaults, name)
-        else:
-            return v
+        chain = self._data_chain()
+        r = chain[item]
+        if r is None and not any(item in d for d in chain.maps[:-1]):
+            # a None coming from the defaults means the variable is not set
+            raise KeyError(item)
+        return r
 
     def __bool__(self) -> bool:
         return bool(self.name)
@@ -377,8 +618,11 @@ class Host(InventoryElement):
     def __setitem__(self, item: str, value: Any) -> None:
         self.data[item] = value
 
+    def __contains__(self, item: object) -> bool:
+        return item in self._data_chain()
+
     def __len__(self) -> int:
-        return len(self.extended_data().keys())
+        return len(self._data_chain())
 
     def __iter__(self) -> Iterator[str]:
         return self.extended_data().__iter__()
@@ -397,13 +641,30 @@ class Host(InventoryElement):
             item(``str``): The variable to get
             default(``any``): Return value if item not found
         """
-        if hasattr(self, item):
-            return getattr(self, item)
-        try:
-            return self.__getitem__(item)
-
-        except KeyError:
+        if item in _class_attributes(type(self)):
+            try:
+                return getattr(self, item)
+            except AttributeError:
+                # declared but never set, fall back to the data as hasattr did
+                pass
+
+        # subclasses without __slots__ may have attributes set on the instance
+        instance_dict: Dict[str, Any] = getattr(self, "__dict__", {})
+        if item in instance_dict:
+            return instance_dict[item]
+
+        chain = self._data_chain()
+        r = chain.get(item)
+        if r is None:
+            if any(item in d for d in chain.maps[:-1]):
+                return None
+            if not item.startswith("_") and hasattr(type(self), item):
+                # added to the class after its attributes were cached
+                _class_attributes_cache.pop(type(self), None)
+                return getattr(self, item, default)
+            # either missing or a None coming from the defaults
             return default
+        return r
 
     def get_connection_parameters(
         self, connection: Optional[str] = None
@@ -483,9 +744,10 @@ class Host(InventoryElement):
         Returns:
             An already established connection
         """
-        if connection not in self.connections:
+        conn_obj = self.connections.get(connection)
+        if conn_obj is None:
             conn = self.get_connection_parameters(connection)
-            self.open_connection(
+            conn_obj = self.open_connection(
                 connection=connection,
                 configuration=configuration,
                 hostname=conn.hostname,
@@ -495,7 +757,7 @@ class Host(InventoryElement):
                 platform=conn.platform,
                 extras=conn.extras,
             )
-        return self.connections[connection].connection
+        return conn_obj.connection
 
     def open_connection(
         self,
@@ -567,7 +829,7 @@ class Host(InventoryElement):
 
 
 class Group(Host):
-    pass
+    __slots__ = ()
 
 
 class Hosts(Dict[str, Host]):
@@ -615,13 +877,12 @@ class Inventory(object):
                 {n: h for n, h in self.hosts.items() if filter_func(h, **kwargs)}
             )
         else:
-            filtered = Hosts(
-                {
-                    n: h
-                    for n, h in self.hosts.items()
-                    if all(h.get(k) == v for k, v in kwargs.items())
-                }
-            )
+            # narrow the candidates one key at a time so every host is only
+            # checked against the keys it hasn't failed yet
+            candidates: Iterable[Tuple[str, Host]] = self.hosts.items()
+            for k, v in kwargs.items():
+                candidates = [(n, h) for n, h in candidates if h.get(k) == v]
+            filtered = Hosts(candidates)
         return Inventory(hosts=filtered, groups=self.groups, defaults=self.defaults)
 
     def __len__(self) -> int:
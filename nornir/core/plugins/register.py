@@ -69,6 +69,7 @@ class PluginRegister(Generic[T]):
         Raises:
             :obj:`nornir.core.exceptions.PluginNotRegistered`
         """
-        if name not in self.available:
+        plugin = self.available.get(name)
+        if plugin is None:
             raise PluginNotRegistered(f"plugin {name!r} is not registered")
-        return self.available[name]
+        return plugin
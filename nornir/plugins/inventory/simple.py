@@ -1,6 +1,7 @@
 import logging
 import pathlib
-from typing import Any, Dict, Type
+import sys
+from typing import Any, Dict, Optional, Type
 
 import ruamel.yaml
 
@@ -19,6 +20,18 @@ from nornir.core.inventory import (
 logger = logging.getLogger(__name__)
 
 
+def _intern(v: Any) -> Any:
+    return sys.intern(v) if isinstance(v, str) else v
+
+
+def _intern_data(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # hosts tend to share the same keys and many of the same string values,
+    # interning them lets lookups and comparisons short-circuit on identity
+    if not data:
+        return data
+    return {_intern(k): _intern(v) for k, v in data.items()}
+
+
 def _get_connection_options(data: Dict[str, Any]) -> Dict[str, ConnectionOptions]:
     cp = {}
     for cn, c in data.items():
@@ -40,25 +53,30 @@ def _get_defaults(data: Dict[str, Any]) -> Defaults:
         username=data.get("username"),
         password=data.get("password"),
         platform=data.get("platform"),
-        data=data.get("data"),
+        data=_intern_data(data.get("data")),
         connection_options=_get_connection_options(data.get("connection_options", {})),
     )
 
 
 def _get_inventory_element(
-    typ: Type[HostOrGroup], data: Dict[str, Any], name: str, defaults: Defaults
+    typ: Type[HostOrGroup],
+    data: Dict[str, Any],
+    name: str,
+    defaults: Defaults,
+    groups: Optional[ParentGroups] = None,
 ) -> HostOrGroup:
+    if groups is None:
+        # this is a hack, we will convert it later to the correct type
+        groups = data.get("groups")
     return typ(
-        name=name,
+        name=_intern(name),
         hostname=data.get("hostname"),
         port=data.get("port"),
         username=data.get("username"),
         password=data.get("password"),
         platform=data.get("platform"),
-        data=data.get("data"),
-        groups=data.get(
-            "groups"
-        ),  # this is a hack, we will convert it later to the correct type
+        data=_intern_data(data.get("data")),
+        groups=groups,
         defaults=defaults,
         connection_options=_get_connection_options(data.get("connection_options", {})),
     )
@@ -101,25 +119,36 @@ class SimpleInventory:
         else:
             defaults = Defaults()
 
-        hosts = Hosts()
-        with open(self.host_file, "r", encoding=self.encoding) as f:
-            hosts_dict = yml.load(f)
-
-        for n, h in hosts_dict.items():
-            hosts[n] = _get_inventory_element(Host, h, n, defaults)
-
         groups = Groups()
         if self.group_file.exists():
             with open(self.group_file, "r", encoding=self.encoding) as f:
                 groups_dict = yml.load(f) or {}
 
-            for n, g in groups_dict.items():
-                groups[n] = _get_inventory_element(Group, g, n, defaults)
+            groups = Groups(
+                {
+                    n: _get_inventory_element(Group, g, n, defaults)
+                    for n, g in groups_dict.items()
+                }
+            )
 
             for g in groups.values():
                 g.groups = ParentGroups([groups[g] for g in g.groups])
 
-        for h in hosts.values():
-            h.groups = ParentGroups([groups[g] for g in h.groups])
+        with open(self.host_file, "r", encoding=self.encoding) as f:
+            hosts_dict = yml.load(f)
+
+        # groups are fully resolved by now so hosts can get them directly
+        hosts = Hosts(
+            {
+                n: _get_inventory_element(
+                    Host,
+                    h,
+                    n,
+                    defaults,
+                    ParentGroups([groups[g] for g in h.get("groups") or ()]),
+                )
+                for n, h in hosts_dict.items()
+            }
+        )
 
         return Inventory(hosts=hosts, groups=groups, defaults=defaults)
@@ -1,4 +1,7 @@
+import copy
 import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 import ruamel.yaml
@@ -16,6 +19,14 @@ with open(f"{dir_path}/../inventory_data/defaults.yaml") as f:
 inv_dict = {"hosts": hosts, "groups": groups, "defaults": defaults}
 
 
+class SlottedHost(inventory.Host):
+    __slots__ = ("site",)
+
+
+class DictHost(inventory.Host):
+    pass
+
+
 class Test(object):
     def test_host(self):
         h = inventory.Host(name="host1", hostname="host1")
@@ -58,6 +69,13 @@ class Test(object):
         assert inv.groups["g1"] in inv.hosts["h1"].groups
         assert inv.groups["g1"] in inv.groups["g2"].groups
 
+    def test_slots(self):
+        g = inventory.Group(name="g1")
+        h = inventory.Host(name="h1", groups=inventory.ParentGroups([g]))
+        inv = inventory.Inventory(hosts={"h1": h}, groups={"g1": g})
+        for obj in (h, g, inv):
+            assert not hasattr(obj, "__dict__")
+
     def test_inventory_data(self, inv):
         """Test Host values()/keys()/items()"""
         h = inv.hosts["dev1.group_1"]
@@ -66,6 +84,7 @@ class Test(object):
         assert "my_var" in h.keys()
         assert "only_default" in h.keys()
         assert "comes_from_dev1.group_1" == dict(h.items())["my_var"]
+        assert len(h) == len(h.keys())
 
     def test_inventory_dict(self, inv):
         assert inv.dict() == {
@@ -664,3 +683,143 @@ class Test(object):
 
         with pytest.raises(ValueError):
             h1.groups.remove(g3)
+
+    def test_data_follows_hierarchy_changes(self):
+        g1 = inventory.Group(name="g1", data={"var1": "val1"})
+        g2 = inventory.Group(name="g2")
+        g3 = inventory.Group(name="g3", groups=inventory.ParentGroups([g2]))
+        h1 = inventory.Host(name="h1", groups=inventory.ParentGroups([g3]))
+        assert h1.get("var1") is None
+
+        g2.groups.append(g1)
+        assert h1["var1"] == "val1"
+
+        g1.data = {"var1": "newval1"}
+        assert h1["var1"] == "newval1"
+
+        g3.groups = inventory.ParentGroups()
+        assert h1.get("var1") is None
+
+    def test_attributes_follow_hierarchy_changes(self):
+        g1 = inventory.Group(name="g1", platform="junos")
+        g2 = inventory.Group(name="g2", platform="eos")
+        h1 = inventory.Host(name="h1", groups=inventory.ParentGroups([g1]))
+        assert h1.platform == "junos"
+        assert h1.extended_groups() == [g1]
+
+        h1.groups.insert(0, g2)
+        assert h1.platform == "eos"
+        assert h1.extended_groups() == [g2, g1]
+
+    def test_contains_and_get(self):
+        defaults = inventory.Defaults(data={"only_default": None, "d": "d"})
+        g1 = inventory.Group(name="g1", data={"from_group": None})
+        h1 = inventory.Host(
+            name="h1",
+            platform="eos",
+            groups=inventory.ParentGroups([g1]),
+            data={"a": 1},
+            defaults=defaults,
+        )
+        assert "a" in h1
+        assert "from_group" in h1
+        assert "missing" not in h1
+        assert h1.get("platform") == "eos"
+        assert h1.get("a") == 1
+        assert h1.get("d") == "d"
+        assert h1.get("from_group", "x") is None
+        assert h1.get("only_default", "x") == "x"
+        assert h1.get("missing", "x") == "x"
+
+    def test_get_ignores_internals(self):
+        class CustomHost(inventory.Host):
+            __slots__ = ("site",)
+
+        h1 = CustomHost(name="h1", data={"site": "dc1"})
+        h1._data_chain()
+        assert h1.get("_chain", "x") == "x"
+        assert h1.get("_groups", "x") == "x"
+        assert h1.get("site") == "dc1"
+        assert h1.get("name") == "h1"
+
+        h2 = DictHost(name="h2", data={"site": "dc1", "rack": "r1"})
+        h2.site = "dc2"
+        assert h2.get("site") == "dc2"
+        assert h2.get("rack") == "r1"
+
+        class LateHost(inventory.Host):
+            pass
+
+        h3 = LateHost(name="h3")
+        assert h3.get("vendor") is None
+        LateHost.vendor = "acme"
+        assert h3.get("vendor") == "acme"
+
+    def test_data_follows_changes_to_plain_list_groups(self):
+        g1 = inventory.Group(name="g1", data={"a": 1})
+        g2 = inventory.Group(name="g2", data={"a": 2})
+        h1 = inventory.Host(name="h1", groups=[g1])
+        assert h1["a"] == 1
+
+        h1.groups.insert(0, g2)
+        assert h1["a"] == 2
+        assert h1.extended_groups() == [g2, g1]
+
+        h1.groups = [g1]
+        assert h1["a"] == 1
+        h1.groups.insert(0, g2)
+        assert h1["a"] == 2
+
+    def test_caches_survive_unrelated_changes(self):
+        g1 = inventory.Group(name="g1", data={"a": 1})
+        h1 = inventory.Host(name="h1", groups=inventory.ParentGroups([g1]))
+        chain = h1._data_chain()
+
+        inventory.Host(name="h2", groups=inventory.ParentGroups([g1]))
+        inventory.Group(name="g2").data = {"a": 2}
+        assert h1._data_chain() is chain
+
+        g1.data = {"a": 3}
+        assert h1._data_chain() is not chain
+        assert h1["a"] == 3
+
+    def test_caches_built_from_threads(self):
+        defaults = inventory.Defaults(data={"b": 1})
+        g1 = inventory.Group(name="g1", data={"a": 1}, defaults=defaults)
+        g2 = inventory.Group(name="g2", data={"a": 2}, defaults=defaults)
+        groups = inventory.ParentGroups([g1])
+        hosts = [
+            inventory.Host(name=f"h{i}", groups=groups, defaults=defaults)
+            for i in range(300)
+        ]
+
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            assert set(pool.map(lambda h: (h["a"], h["b"]), hosts)) == {(1, 1)}
+
+        groups.insert(0, g2)
+        defaults.data = {"b": 2}
+        assert {(h["a"], h["b"]) for h in hosts} == {(2, 2)}
+
+    def test_copy_host(self):
+        g1 = inventory.Group(name="g1", data={"a": 1})
+        g2 = inventory.Group(name="g2", data={"a": 2})
+        h1 = inventory.Host(name="h1", groups=inventory.ParentGroups([g1]))
+        assert h1["a"] == 1
+
+        for h2 in (copy.deepcopy(h1), pickle.loads(pickle.dumps(h1))):
+            assert h2["a"] == 1
+            h2.groups.insert(0, g2)
+            assert h2["a"] == 2
+        assert h1["a"] == 1
+
+        h3 = SlottedHost(name="h3", groups=inventory.ParentGroups([g1]))
+        h4 = DictHost(name="h4", groups=inventory.ParentGroups([g1]))
+        h4.site = "dc1"
+        for c in (copy.copy, copy.deepcopy, lambda h: pickle.loads(pickle.dumps(h))):
+            h5 = c(h3)
+            assert h5.name == "h3"
+            assert h5["a"] == 1
+            assert not hasattr(h5, "site")
+            h6 = c(h4)
+            assert h6.site == "dc1"
+            assert h6["a"] == 1